@@ -0,0 +1,15 @@
+import copy
+import pickle
+from torchslime.util import NOTHING, is_nothing
+
+
+def test_nothing_copy():
+    assert copy.copy(NOTHING) is NOTHING
+    assert copy.deepcopy(NOTHING) is NOTHING
+    # nested in containers
+    assert copy.deepcopy({'a': NOTHING})['a'] is NOTHING
+
+
+def test_nothing_pickle():
+    assert pickle.loads(pickle.dumps(NOTHING)) is NOTHING
+    assert is_nothing(pickle.loads(pickle.dumps([NOTHING]))[0])
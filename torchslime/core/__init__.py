@@ -90,13 +90,17 @@ class Proxy(Context):
         lr_decay: Any = None,
         optimizer_options: Optional[Dict] = None,
         lr_decay_options: Optional[Dict] = None,
-        data_parser: Optional[DataParser] = None
+        data_parser: Optional[DataParser] = None,
+        prefetch: Optional[bool] = None,
+        torchscript: Optional[bool] = None
     ) -> T:
         self.build_loss(loss)
         self.build_metrics(metrics)
         self.build_data_parser(data_parser)
         self.build_optimizer(optimizer, lr, optimizer_options)
         self.build_lr_decay(lr_decay, lr_decay_options)
+        self.build_prefetch(prefetch)
+        self.build_torchscript(torchscript)
 
     @InvocationDebug('Proxy.TrainBuilder')
     @MethodChaining
@@ -285,3 +289,15 @@ class Proxy(Context):
     def build_grad_acc(self, grad_acc: int):
         if grad_acc is not None:
             self.run.grad_acc = grad_acc
+
+    @InvocationDebug('Proxy.build_prefetch')
+    def build_prefetch(self, prefetch: bool):
+        # asynchronously prefetch batches, only takes effect on cuda devices
+        if prefetch is not None:
+            self.run.prefetch = prefetch
+
+    @InvocationDebug('Proxy.build_torchscript')
+    def build_torchscript(self, torchscript: bool):
+        # run the forward pass with a TorchScript-compiled model
+        if torchscript is not None:
+            self.run.torchscript = torchscript
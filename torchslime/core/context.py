@@ -7,6 +7,14 @@ from ..util.type import NUMBER
 from typing import Any, Sequence, Union, Dict, Tuple
 from ..log import logger
 from abc import abstractmethod
+from functools import lru_cache
+from operator import attrgetter
+
+
+@lru_cache(maxsize=None)
+def _get_accessor(item: str):
+    # compile the dot-separated path once, 'attrgetter' resolves it in C
+    return attrgetter(item)
 
 
 class Context(Base):
@@ -52,7 +60,12 @@ class Context(Base):
     def ctx_check(self, items: Union[str, Sequence[str]], silent: bool = True):
         # check single item
         def _check(_item):
-            _result = super(Context, self).check(_item)
+            try:
+                # NOTHING is propagated through the rest of the path, because any attribute of NOTHING is itself
+                _result = _get_accessor(_item)(self) is not NOTHING
+            except Exception:
+                # fall back to the item-based check, e.g., for dict values in the path
+                _result = super(Context, self).check(_item)
             if _result is False:
                 msg = 'Context check failed: got NOTHING with key \'%s\'.' % _item
                 if silent is True:
@@ -162,6 +175,12 @@ class RunContext(TempContext):
         self.loss: Module = NOTHING
         # gradient accumulation
         self.grad_acc: int = 1
+        # asynchronously prefetch batches to the cuda device
+        self.prefetch: bool = False
+        # run the forward pass with a TorchScript-compiled model
+        self.torchscript: bool = False
+        # the compiled model shared by all the forward handlers: (original model, dtype, scripted model)
+        self.scripted_cache: Tuple = NOTHING
         # learning rate
         self.lr: NUMBER = NOTHING
         # learning rate decay
@@ -1,11 +1,21 @@
 from abc import abstractmethod
+from time import monotonic
 from typing import Dict, Sequence, Union
-from ..util import BaseList, IterTool, NOTHING, is_nothing, safe_divide, type_cast, InvocationDebug, SmartWrapper
+from ..util import BaseList, IterTool, NOTHING, safe_divide, type_cast, get_dtype, InvocationDebug, SmartWrapper
 import torchslime.util.terminal as Cursor
 from ..util.formatter import progress_format, eta_format
 from .context import Context
+from .status import proxy_status
+from ..data import PrefetchLoader
 from ..log import logger
-from torch import set_grad_enabled
+import torch
+from torch import Tensor, set_grad_enabled
+from torch.utils._pytree import tree_map
+
+
+# marks the cached items of a handler that has not been bound by an iteration handler,
+# different from 'None', which means the item is bound but missing in the context.
+_UNBOUND = object()
 
 
 def TorchGrad(func):
@@ -31,6 +41,14 @@ class Handler:
     def handle(self, ctx: Context):
         pass
 
+    def bind(self, ctx: Context):
+        """
+        Resolve the context items that stay unchanged during a dataset iteration, so that they
+        are not looked up again at every step.
+        Handlers that are not bound look up the context items at every step instead.
+        """
+        pass
+
     def __call__(self, ctx: Context):
         self.handle(ctx)
 
@@ -51,6 +69,20 @@ class EmptyHandler(Handler):
         pass
 
 
+def _is_cuda(device) -> bool:
+    return str(device).startswith('cuda')
+
+
+def _batch_to_device(batch, device, non_blocking: bool = False):
+    """
+    Move all the tensors in the (nested) batch to the device in a single traversal.
+    Copies to a cuda device should be non-blocking, so the transfers of different tensors overlap.
+    """
+    if device is None or device is NOTHING:
+        return batch
+    return tree_map(lambda item: item.to(device, non_blocking=non_blocking) if isinstance(item, Tensor) else item, batch)
+
+
 # handler or sequence of handlers
 C_SEQ = Union[Handler, Sequence[Handler]]
 
@@ -60,10 +92,39 @@ class HandlerContainer(Handler, BaseList):
     def __init__(self, handlers: C_SEQ = None):
         super().__init__()
         BaseList.__init__(self, handlers)
+        # compiled execution plan, 'None' until the container is bound
+        self._plan = None
     
     def handle(self, ctx: Context):
+        plan = self._plan
+        if plan is None:
+            for handler in self:
+                handler(ctx)
+        else:
+            for func in plan:
+                func(ctx)
+
+    def bind(self, ctx: Context):
+        for handler in self:
+            handler.bind(ctx)
+        # the plan is recompiled at every binding, so changes of the handlers are always applied
+        self._plan = self._compile_plan()
+
+    def _compile_plan(self) -> tuple:
+        """
+        Compile the handlers to a flat tuple of callables, which avoids the '__call__' indirection
+        and the recursion through plain containers at every step.
+        """
+        plan = []
         for handler in self:
-            handler(ctx)
+            if type(handler) is HandlerContainer:
+                # plain containers only call their children in order, so they are flattened
+                plan.extend(handler._compile_plan())
+            elif type(handler).__call__ is Handler.__call__:
+                plan.append(handler.handle)
+            else:
+                plan.append(handler)
+        return tuple(plan)
 
 
 class EpochIterationHandler(HandlerContainer):
@@ -94,14 +155,28 @@ class IterationHandler(HandlerContainer):
     def handle(self, ctx: Context):
         # context check
         if ctx.ctx_check('dataset') is True:
-            for batch, progress, time, current, total in IterTool(ctx.dataset, True, True, True, True):
-                ctx.step.from_dict({
-                    'batch': batch, # original batch data of the dataset
-                    'progress': progress, # progress of iteration(includes current step and total steps)
-                    'time': time, # time of the iter(current time)
-                    'current': current, # the current step
-                    'total': total # total steps of iteration
-                })
+            dataset = ctx.dataset
+            # overlap the host-to-device copy of the next batches with the current step
+            if ctx.run.prefetch is True and _is_cuda(ctx.device):
+                dataset = PrefetchLoader(dataset, ctx.device)
+            iter_tool = IterTool(dataset, True, True, True, True)
+            # the step context is a const attribute, so it can be safely referenced outside the loop
+            step = ctx.step
+            # total steps are fixed during the iteration, so they are set before binding
+            step.total = len(iter_tool)
+            # resolve the context items used by the subsequent handlers
+            self.bind(ctx)
+            for batch, progress, time, current, total in iter_tool:
+                # original batch data of the dataset
+                step.batch = batch
+                # progress of iteration(includes current step and total steps)
+                step.progress = progress
+                # time of the iter(current time)
+                step.time = time
+                # the current step
+                step.current = current
+                # total steps of iteration
+                step.total = total
                 # carry out the subsequent actions
                 super().handle(ctx)
 
@@ -110,9 +185,18 @@ class ForwardHandler(Handler):
     
     def __init__(self):
         super().__init__()
+        # the model used in the forward pass, 'None' means using 'ctx.model' directly
+        self._model = _UNBOUND
+        # whether the copies to the device are non-blocking
+        self._non_blocking = False
 
-    @InvocationDebug('ForwardHandler')
-    def handle(self, ctx: Context):
+    def bind(self, ctx: Context):
+        self._check(ctx)
+        self._model = self._get_scripted_model(ctx) if ctx.run.torchscript is True else None
+        self._non_blocking = _is_cuda(ctx.device)
+
+    @staticmethod
+    def _check(ctx: Context):
         # context check
         ctx.ctx_check([
             'model',
@@ -120,31 +204,70 @@ class ForwardHandler(Handler):
             'run.data_parser',
             'step'
         ], silent=False)
+
+    @staticmethod
+    def _get_scripted_model(ctx: Context):
+        model = ctx.model
+        dtype = get_dtype(model)
+        # the compiled model is cached in the run context, so the train / eval / predict handlers share it.
+        # the scripted model respects the ambient grad mode, so it is only keyed on the model and its dtype
+        cache = ctx.run.scripted_cache
+        if cache is not NOTHING and cache[0] is model and cache[1] == dtype:
+            scripted = cache[2]
+        else:
+            # 'torch.jit.freeze' is never applied here, because the parameters are still updated in training
+            scripted = torch.jit.script(model)
+            ctx.run.scripted_cache = (model, dtype, scripted)
+        # the compiled model keeps its own train / eval mode
+        scripted.train(model.training)
+        return scripted
+
+    @InvocationDebug('ForwardHandler')
+    def handle(self, ctx: Context):
+        model = self._model
+        non_blocking = self._non_blocking
+        if model is _UNBOUND:
+            # not bound, so the context is checked at every step
+            self._check(ctx)
+            model = None
+            non_blocking = _is_cuda(ctx.device)
+        if model is None:
+            model = ctx.model
         # forward
         x, y_true, extra = ctx.run.data_parser(ctx)
-        y_pred = ctx.model(type_cast(x, ctx.device))
-        y_true = type_cast(y_true, ctx.device)
-        # clone and update context info
-        ctx.step.from_dict({
-            # the result of the forward progress
-            'x': x,
-            'y_true': y_true,
-            'y_pred': y_pred,
-            'extra': extra
-        })
+        # 'type_cast' without device only normalizes the sequences, then the input and the label are moved together
+        x_device, y_true = _batch_to_device((type_cast(x), type_cast(y_true)), ctx.device, non_blocking)
+        y_pred = model(x_device)
+        # update context info with the result of the forward progress
+        step = ctx.step
+        step.x = x
+        step.y_true = y_true
+        step.y_pred = y_pred
+        step.extra = extra
 
 
 class LossHandler(Handler):
 
     def __init__(self):
         super().__init__()
+        self._loss_func = _UNBOUND
+
+    def bind(self, ctx: Context):
+        self._loss_func = self._get_loss_func(ctx)
+
+    @staticmethod
+    def _get_loss_func(ctx: Context):
+        # context check
+        return ctx.run.loss if ctx.ctx_check('run.loss') is True else None
     
     @InvocationDebug('LossHandler')
     def handle(self, ctx: Context):
-        # context check
-        if ctx.ctx_check('run.loss') is True:
+        loss_func = self._loss_func
+        if loss_func is _UNBOUND:
+            loss_func = self._get_loss_func(ctx)
+        if loss_func is not None:
             # compute loss
-            loss = ctx.run.loss(ctx.step.y_pred, ctx.step.y_true)
+            loss = loss_func(ctx.step.y_pred, ctx.step.y_true)
             ctx.step.loss = loss
 
 
@@ -152,43 +275,91 @@ class BackwardHandler(Handler):
 
     def __init__(self):
         super().__init__()
+        # (reciprocal of the gradient accumulation steps,
+        # reciprocal of the remaining steps at the end of the iteration,
+        # the step from which the remaining steps are accumulated)
+        self._divisors = _UNBOUND
+
+    def bind(self, ctx: Context):
+        self._divisors = self._get_divisors(ctx)
+
+    @staticmethod
+    def _get_divisors(ctx: Context):
+        grad_acc = ctx.run.grad_acc
+        total = ctx.step.total
+        last = total % grad_acc
+        inv_grad_acc = 1.0 / grad_acc
+        inv_last = 1.0 / last if last != 0 else inv_grad_acc
+        return inv_grad_acc, inv_last, total - last
 
     @InvocationDebug('BackwardHandler')
     def handle(self, ctx: Context):
-        # context check
-        if ctx.ctx_check(['step.loss']) is True:
-            last = ctx.step.total % ctx.run.grad_acc
-            grad_acc = ctx.run.grad_acc if (ctx.step.total - ctx.step.current - 1) >= last else last
+        # the loss is set per step, so it is still checked here
+        if ctx.step.loss is not NOTHING:
+            divisors = self._divisors
+            if divisors is _UNBOUND:
+                divisors = self._get_divisors(ctx)
+            inv_grad_acc, inv_last, tail_start = divisors
+            inv_grad_acc = inv_grad_acc if ctx.step.current < tail_start else inv_last
             # backward
-            (ctx.step.loss / grad_acc).backward()
+            (ctx.step.loss * inv_grad_acc).backward()
 
 
 class OptimizerHandler(HandlerContainer):
 
     def __init__(self, handlers: C_SEQ = None):
         super().__init__(handlers)
+        self._optimizer = _UNBOUND
+        self._grad_acc = _UNBOUND
+
+    def bind(self, ctx: Context):
+        # bind the backward handler
+        super().bind(ctx)
+        self._optimizer = self._get_optimizer(ctx)
+        self._grad_acc = ctx.run.grad_acc
+
+    @staticmethod
+    def _get_optimizer(ctx: Context):
+        # context check
+        return ctx.run.optimizer if ctx.ctx_check(['run.optimizer']) is True else None
     
     @InvocationDebug('OptimizerHandler')
     def handle(self, ctx: Context):
         # backward handler
         super().handle(ctx)
-        if ctx.ctx_check(['run.optimizer']) is True and \
-            ((ctx.step.current + 1) % ctx.run.grad_acc == 0 or ctx.step.current + 1 == ctx.step.total):
-            ctx.run.optimizer.step()
-            ctx.run.optimizer.zero_grad()
+        optimizer = self._optimizer
+        grad_acc = self._grad_acc
+        if optimizer is _UNBOUND:
+            optimizer = self._get_optimizer(ctx)
+            grad_acc = ctx.run.grad_acc
+        if optimizer is not None and \
+            ((ctx.step.current + 1) % grad_acc == 0 or ctx.step.current + 1 == ctx.step.total):
+            optimizer.step()
+            optimizer.zero_grad()
 
 
 class MetricsHandler(Handler):
 
     def __init__(self):
         super().__init__()
+        self._metrics = _UNBOUND
+
+    def bind(self, ctx: Context):
+        self._metrics = self._get_metrics(ctx)
+
+    @staticmethod
+    def _get_metrics(ctx: Context):
+        # context check
+        ctx.ctx_check('step', silent=False)
+        return ctx.run.metrics if ctx.ctx_check('run.metrics') is True else None
     
     @InvocationDebug('MetricsHandler')
     def handle(self, ctx: Context):
-        # context check
-        ctx.ctx_check('step', silent=False)
-        if ctx.ctx_check('run.metrics') is True:
-            ctx.step.metrics = ctx.run.metrics(ctx)
+        metrics = self._metrics
+        if metrics is _UNBOUND:
+            metrics = self._get_metrics(ctx)
+        if metrics is not None:
+            ctx.step.metrics = metrics(ctx)
 
 
 # TODO: implementation to be optimized
@@ -215,18 +386,57 @@ class AverageHandler(Handler):
     def average(self, ctx: Context):
         # get inner context variables
         summary = ctx.status.get_avg_inner_ctx(ctx, self.INNER_KEY)
+        loss, metrics = self._parse_float(ctx.step.loss, ctx.step.metrics)
         # get average loss and metrics
-        avg_loss = self._compute_avg_loss(summary, ctx.step.loss)
-        avg_metrics = self._compute_avg_metrics(summary, ctx.step.metrics)
+        avg_loss = self._compute_avg_loss(summary, loss)
+        avg_metrics = self._compute_avg_metrics(summary, metrics)
         ctx.status.set_avg_loss_and_metrics(ctx, avg_loss, avg_metrics)
 
     def clear(self, ctx: Context):
         # reset avg info
         ctx.status.clear_avg_info(ctx, self.INNER_KEY)
 
+    @staticmethod
+    def _parse_float(loss, metrics):
+        """
+        Convert the scalar tensors in loss and metrics to python floats using a single device-to-host copy,
+        rather than one implicit synchronization per value.
+        """
+        keys = []
+        tensors = []
+        if isinstance(loss, Tensor) and loss.numel() == 1:
+            # 'None' stands for the loss, so it never conflicts with metric names
+            keys.append(None)
+            tensors.append(loss.detach().reshape(()))
+        if isinstance(metrics, dict):
+            for key, value in metrics.items():
+                if isinstance(value, Tensor) and value.numel() == 1:
+                    keys.append(key)
+                    tensors.append(value.detach().reshape(()))
+        if len(tensors) == 0:
+            return loss, metrics
+
+        if len(tensors) == 1:
+            # a single value(usually the loss) is copied directly, without the extra 'stack' kernel
+            values = [tensors[0].item()]
+        else:
+            device = tensors[0].device
+            dtype = tensors[0].dtype
+            for tensor in tensors[1:]:
+                dtype = torch.promote_types(dtype, tensor.dtype)
+            values = torch.stack([tensor.to(device=device, dtype=dtype) for tensor in tensors]).tolist()
+
+        metrics = dict(metrics) if isinstance(metrics, dict) else metrics
+        for key, value in zip(keys, values):
+            if key is None:
+                loss = float(value)
+            else:
+                metrics[key] = float(value)
+        return loss, metrics
+
     @staticmethod
     def _compute_avg_loss(summary, loss):
-        if 'loss' in summary and 'count' in summary and is_nothing(loss) is False:
+        if 'loss' in summary and 'count' in summary and loss is not NOTHING:
             summary['loss'] += float(loss)
             summary['count'].setdefault('loss', 0)
             summary['count']['loss'] += 1
@@ -237,30 +447,36 @@ class AverageHandler(Handler):
     @staticmethod
     def _compute_avg_metrics(summary: Dict, metrics: Dict):
         if 'metrics' in summary and 'count' in summary:
-            temp = {}
             _metrics = summary['metrics']
+            count = summary['count']
             for key, value in metrics.items():
-                _metrics.setdefault(key, 0)
-                _metrics[key] += value
-                summary['count'].setdefault(key, 0)
-                summary['count'][key] += 1
-            for key, value in _metrics.items():
-                temp[key] = safe_divide(value, summary['count'].setdefault(key, 0))
-            return temp
+                _metrics[key] = _metrics.get(key, 0) + value
+                count[key] = count.get(key, 0) + 1
+            return {key: safe_divide(value, count[key]) for key, value in _metrics.items()}
         else:
             return NOTHING
 
 
 class DisplayHandler(Handler):
 
+    # minimum interval(in seconds) between two console refreshes
+    REFRESH_INTERVAL = 0.1
+
     def __init__(self):
         super().__init__()
+        self._last_refresh = 0.0
     
     @InvocationDebug('DisplayHandler')
     def handle(self, ctx: Context):
         current = ctx.step.current
         total = ctx.step.total
 
+        now = monotonic()
+        # the first and the last steps are always displayed, while the others are throttled
+        if current != 0 and current + 1 != total and now - self._last_refresh < self.REFRESH_INTERVAL:
+            return
+        self._last_refresh = now
+
         data = ' '.join(ctx.status.get_avg_loss_and_metrics(ctx))
 
         with Cursor.cursor_invisible():
@@ -299,7 +515,6 @@ class StatusHandler(Handler):
     def __init__(self, status: str = 'train'):
         super().__init__()
         # get status supported
-        from .status import proxy_status
         mode_supported = list(proxy_status.modules.keys())
         if status not in mode_supported:
             logger.warn('An unsupported status is set, this may cause some problems.')
@@ -312,7 +527,6 @@ class StatusHandler(Handler):
             'model'
         ], silent=False)
         # set status to the context
-        from .status import proxy_status
         ctx.status = proxy_status.build(self.status)
         # change pytorch model mode
         ctx.status.set_model_mode(ctx)
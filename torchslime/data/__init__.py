@@ -1,5 +1,10 @@
 from abc import abstractmethod
+from threading import Thread, Event
+from queue import Queue, Empty
+import torch
+from torch import Tensor
 from torch.utils.data import DataLoader
+from torch.utils._pytree import tree_map, tree_flatten
 from ..core.context import Context
 from ..util import list_take
 from ..log import logger
@@ -32,6 +37,80 @@ class ConstantProvider(DataProvider):
         return self.dataset
 
 
+class PrefetchLoader:
+    """
+    Wraps a data loader and copies the following batches to the device on a dedicated CUDA stream
+    in a background thread, so the host-to-device transfer overlaps with the computation of the current step.
+    """
+
+    def __init__(self, loader: DataLoader, device, q_size: int = 2):
+        self.loader = loader
+        self.device = torch.device(device)
+        self.q_size = q_size
+        self.load_stream = torch.cuda.Stream(device=self.device)
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        queue = Queue(maxsize=self.q_size)
+        stop = Event()
+        worker = Thread(target=self.load_loop, args=(queue, stop), daemon=True)
+        worker.start()
+        current_stream = torch.cuda.current_stream(self.device)
+        try:
+            while True:
+                item = queue.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                batch, event = item
+                # make the compute stream wait until the batch has been copied
+                current_stream.wait_event(event)
+                self._record_stream(batch, current_stream)
+                yield batch
+        finally:
+            stop.set()
+            # unblock the worker if it is waiting on a full queue
+            while worker.is_alive():
+                try:
+                    queue.get_nowait()
+                except Empty:
+                    worker.join(timeout=0.01)
+
+    def load_loop(self, queue: Queue, stop: Event):
+        try:
+            for batch in self.loader:
+                if stop.is_set():
+                    return
+                with torch.cuda.stream(self.load_stream):
+                    batch = self._to_device(batch)
+                    event = self.load_stream.record_event()
+                queue.put((batch, event))
+            queue.put(None)
+        except BaseException as e:
+            queue.put(e)
+
+    def _to_device(self, obj):
+        # 'tree_map' keeps the container types(e.g., namedtuple) of the batch
+        return tree_map(self._tensor_to_device, obj)
+
+    def _tensor_to_device(self, obj):
+        if isinstance(obj, Tensor):
+            # pinned memory is required for a truly asynchronous copy
+            obj = obj.pin_memory() if obj.device.type == 'cpu' else obj
+            return obj.to(self.device, non_blocking=True)
+        return obj
+
+    @staticmethod
+    def _record_stream(obj, stream):
+        # tensors allocated on the load stream are used on the compute stream
+        for item in tree_flatten(obj)[0]:
+            if isinstance(item, Tensor) and item.is_cuda:
+                item.record_stream(stream)
+
+
 class DataParser:
 
     def __init__(self):
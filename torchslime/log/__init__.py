@@ -12,6 +12,11 @@ color_dict = {
     'w': 37  # white
 }
 
+# escape sequences are built once instead of formatting them at every output
+color_prefix_dict = {color: '\033[%dm' % code for color, code in color_dict.items()}
+default_color_prefix = '\033[38m'
+color_suffix = '\033[0m'
+
 info_prefix = '[TorchSlime INFO]'
 warn_prefix = '[TorchSlime WARN]'
 error_prefix = '[TorchSlime ERROR]'
@@ -19,14 +24,15 @@ debug_prefix = '[TorchSlime DEBUG]'
 
 
 def color_format(*args, color: str, sep: str = ' '):
-    color_prefix = '\033[%dm' % color_dict.get(color, 38)
-    color_suffix = '\033[0m'
+    color_prefix = color_prefix_dict.get(color, default_color_prefix)
     return '%s%s%s' % (color_prefix, sep.join(str(arg) for arg in args), color_suffix)
 
 
 @Singleton
 class Logger:
 
+    __slots__ = ('_control',)
+
     # TODO: 如果同时想要文件输出怎么设计
     def __init__(self):
         self._control = {
@@ -51,7 +57,11 @@ class Logger:
     def log(self, *args, **kwargs):
         print(*args, **kwargs)
 
+    def is_enabled(self, type: str) -> bool:
+        return self._control.get(type, False) is True
+
     def output(self, *args, type: str, color: str = 'w'):
+        # output only when the level is switched on
         if self._control.get(type, False) is True:
             print(color_format(*args, color=color))
 
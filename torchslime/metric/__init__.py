@@ -1,7 +1,7 @@
 from abc import abstractmethod
 from typing import Union, Dict, Sequence
 from ..util.type import NUMBER, NUMBER_T
-from ..util import Count, Nothing, is_nothing, dict_merge, NOTHING, BaseList
+from ..util import Count, Nothing, NOTHING, BaseList
 from ..core.context import Context
 
 
@@ -42,7 +42,6 @@ class MetricContainer(Metric, BaseList):
         for metric in self:
             _res = metric(ctx)
             # is not Nothing
-            if is_nothing(_res) is False:
-                # TODO: change the dict merge operation
-                result = dict_merge(result, _res)
+            if _res is not NOTHING:
+                result.update(_res)
         return result
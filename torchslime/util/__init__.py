@@ -1,6 +1,6 @@
 # TODO: refactor the util package
 from typing import Dict, Union, Tuple, Sequence
-from collections.abc import Iterator, Iterable
+from collections.abc import Iterable
 from .type import T_M_SEQ, T_M
 from torch import Tensor
 from torch.nn import Module
@@ -9,6 +9,12 @@ from functools import wraps
 from time import time
 import traceback
 import inspect
+import os
+import sys
+
+
+# whether the interpreter runs without the GIL (free-threaded build, PEP 703).
+FREE_THREADED: bool = hasattr(sys, '_is_gil_enabled') and sys._is_gil_enabled() is False
 
 
 def SmartWrapper(cls):
@@ -23,12 +29,12 @@ def SmartWrapper(cls):
     def decorator(func):
         if inspect.isclass(cls):
             class Wrapper:
+                # call 'func' directly rather than through an extra '*args, **kwargs' frame
+                __call__ = staticmethod(func)
+
                 def __init__(self, _class) -> None:
                     self._class = _class
                 
-                def __call__(self, *args, **kwargs) -> None:
-                    return func(*args, **kwargs)
-                
                 def __repr__(self):
                     return "Smart wrapper object: {}. (You can get the original decorated class by accessing the attribute '_class')".format(super().__repr__())
                 
@@ -36,10 +42,8 @@ def SmartWrapper(cls):
                     return "Smart wrapper object: {}. (You can get the original decorated class by accessing the attribute '_class')".format(super().__repr__())
             return wraps(cls)(Wrapper(cls))
         elif inspect.isfunction(cls) or inspect.ismethod(cls):
-            @wraps(cls)
-            def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
-            return wrapper
+            # 'func' is already a new function, so it is returned directly without a trampoline
+            return wraps(cls)(func)
     return decorator
 
 
@@ -49,34 +53,62 @@ def Singleton(cls):
     It makes the creation of the singleton object thread-safe by using double-checked locking.
     """
     _lock = threading.Lock()
-    _instance = {}
+    _instance = None
     
     @SmartWrapper(cls)
     def wrapper(*args, **kwargs):
-        if cls not in _instance:
-            with _lock:
-                if cls not in _instance:
-                    _instance[cls] = cls(*args, **kwargs)
-        return _instance[cls]
+        nonlocal _instance
+        # fast path without lock once the instance is created.
+        # the unlocked read is only trusted when the GIL is enabled
+        if FREE_THREADED is False:
+            instance = _instance
+            if instance is not None:
+                return instance
+        with _lock:
+            instance = _instance
+            if instance is None:
+                # publish the instance only after it is fully constructed
+                instance = cls(*args, **kwargs)
+                _instance = instance
+        return instance
     return wrapper
 
 
 # set import here to avoid import error
 from ..log import logger
 
+# whether 'InvocationDebug' wraps methods, determined once at import time.
+# only the explicit truthy values enable it.
+INVOCATION_DEBUG: bool = os.environ.get('TORCHSLIME_DEBUG', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
 
 def InvocationDebug(module_name):
     """A decorator that output debug information before and after a method is invoked.
+    It only takes effect when the environment variable 'TORCHSLIME_DEBUG' is set, otherwise
+    the original method is returned, so that no extra call overhead is introduced.
 
     Args:
         func (_type_): _description_
     """
     def decorator(func):
+        if INVOCATION_DEBUG is False:
+            return func
+
+        # resolve the logger methods once at decoration time
+        _debug = logger.debug
+        _is_enabled = logger.is_enabled
+        # 'module_name' is fixed, so the messages are built only once
+        _begin_msg = '%s begin.' % module_name
+        _end_msg = '%s end.' % module_name
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            logger.debug(module_name, 'begin.')
+            # call the method directly when the debug output is disabled
+            if _is_enabled('debug') is False:
+                return func(*args, **kwargs)
+            _debug(_begin_msg)
             result = func(*args, **kwargs)
-            logger.debug(module_name, 'end.')
+            _debug(_end_msg)
             return result
         return wrapper
     return decorator
@@ -91,15 +123,30 @@ class Nothing:
     It will show Warnings in the console instead.
     """
 
+    # no instance dict is needed for the singleton
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
     def __call__(self, *args, **kwargs):
         return self
 
-    def __getattribute__(self, *_):
+    def __getattr__(self, *_):
+        # only called when the normal lookup misses, so dunders and methods are found directly
+        return self
+
+    def __copy__(self):
+        # keep the singleton, so that identity checks still work on copied objects
+        return self
+
+    def __deepcopy__(self, _):
         return self
 
+    def __reduce__(self):
+        # pickled as a reference to the module-level 'NOTHING'
+        return 'NOTHING'
+
     def __getitem__(self, *_):
         return self
 
@@ -168,7 +215,7 @@ def is_nothing(obj):
 
 
 def check_nothing(obj, x, y=NOTHING):
-    return x if is_nothing(obj) is False else y
+    return x if obj is not NOTHING else y
 
 
 def dict_merge(dict1: Dict, dict2: Dict):
@@ -192,56 +239,64 @@ class Base:
         Args:
             kwargs (Dict): property dict.
         """
-        self.__dict__ = dict_merge(self.__dict__, kwargs)
+        self.__dict__.update(kwargs)
 
-    def check(self, item: str):
+    def check(self, item: str, *, _NOTHING=NOTHING):
         """check whether the object has a specific attribute.
         dot operator supported.
 
         Args:
             items (str): _description_
         """
-        attrs = item.split('.')
         temp = self
-        for attr in attrs:
+        rest = item
+        while True:
+            # take the path segments one by one without building a list
+            attr, sep, rest = rest.partition('.')
             try:
-                temp = temp[attr]
-                # if the value is NOTHING, then return False directly.
-                if is_nothing(temp):
-                    return False
+                # 'getattr' avoids the extra '__getitem__' call for Base objects,
+                # and it is not affected by the attributes(e.g., 'get') defined by users
+                temp = getattr(temp, attr, _NOTHING) if isinstance(temp, Base) else temp[attr]
             except Exception:
                 # output error infomation
                 self.process_exc()
                 return False
-        return True
+            # if the value is NOTHING, then return False directly.
+            if temp is _NOTHING:
+                return False
+            if not sep:
+                return True
 
     @staticmethod
     def process_exc():
-        # output error
-        logger.error(
-            'Python exception raised:\n' +
-            traceback.format_exc()
-        )
+        # output error, the traceback is only formatted when it is actually displayed
+        if logger.is_enabled('error'):
+            logger.error(
+                'Python exception raised:\n' +
+                traceback.format_exc()
+            )
         return NOTHING
 
-    def __getattr__(self, *_):
-        return NOTHING
+    def __getattr__(self, *_, _NOTHING=NOTHING):
+        # only called when the normal lookup misses, no traceback is involved here
+        return _NOTHING
 
-    def __getitem__(self, key):
+    def __getitem__(self, key, _getattribute=object.__getattribute__):
+        # call the c-implemented lookup directly instead of going through the 'getattr' builtin
         try:
-            return getattr(self, key)
+            return _getattribute(self, key)
+        except AttributeError:
+            # same fallback as the normal attribute access
+            return self.__getattr__(key)
         except Exception:
             return self.process_exc()
     
-    def __setitem__(self, key, value):
+    def __setitem__(self, key, value, _setattr=object.__setattr__):
         try:
-            return setattr(self, key, value)
+            return _setattr(self, key, value)
         except Exception:
             return self.process_exc()
 
-    def __getattribute__(self, key):
-        return super().__getattribute__(key)
-    
     def __delattr__(self, __name: str) -> None:
         # safe delete
         try:
@@ -263,6 +318,8 @@ class SingleConst:
     *****
     """
 
+    __slots__ = ('value',)
+
     def __init__(self, value=NOTHING):
         # the default value will refer to the same 'Nothing'.
         super().__init__()
@@ -270,7 +327,7 @@ class SingleConst:
 
     def __set__(self, _, value):
         # the value can be changed only when it's 'Nothing'
-        if is_nothing(self.value):
+        if self.value is NOTHING:
             self.value = value
         else:
             # TODO: show warnings
@@ -308,6 +365,9 @@ class MultiConst:
     with '__' as a prefix, making the attribute unaccessible through '__foo' outside the class.
     *****
     """
+
+    __slots__ = ('private_name',)
+
     def __init__(self):
         super().__init__()
     
@@ -316,7 +376,7 @@ class MultiConst:
 
     def __set__(self, instance, value):
         temp = getattr(instance, self.private_name, NOTHING)
-        if is_nothing(temp):
+        if temp is NOTHING:
             setattr(instance, self.private_name, value)
         else:
             # TODO: show warnings
@@ -328,6 +388,8 @@ class MultiConst:
 
 class Count(SingleConst):
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(0)
 
@@ -339,9 +401,14 @@ class Count(SingleConst):
 
 class BaseList(list):
 
+    __slots__ = ()
+
     def __init__(self, list_like: Iterable=None):
-        if list_like is None or is_nothing(list_like):
+        if list_like is None or list_like is NOTHING:
             super().__init__()
+        elif isinstance(list_like, (list, tuple)):
+            # fast path: skip the abc 'Iterable' check for the common builtin sequences
+            super().__init__(list_like)
         else:
             super().__init__(list_like if isinstance(list_like, Iterable) else [list_like])
 
@@ -382,13 +449,14 @@ def get_dtype(obj: T_M):
         return None
 
 
-def type_cast(obj: T_M_SEQ, device=None, dtype=None) -> Union[Tuple[Tensor, Module], Tensor, Module, None]:
+def type_cast(obj: T_M_SEQ, device=None, dtype=None, non_blocking: bool = False) -> Union[Tuple[Tensor, Module], Tensor, Module, None]:
     """Apply type cast to the model or tensor.
 
     Args:
         obj (T_M_SEQ): tensor, model, list of tensor or list of model
         device ([type], optional): device. Defaults to None.
         dtype ([type], optional): dtype. Defaults to None.
+        non_blocking (bool, optional): asynchronous copy, only useful for pinned tensors. Defaults to False.
 
     Returns:
         Union[Tuple[Tensor, Module], Tensor, Module, None]: [description]
@@ -396,10 +464,9 @@ def type_cast(obj: T_M_SEQ, device=None, dtype=None) -> Union[Tuple[Tensor, Modu
     obj = obj if isinstance(obj, (list, tuple)) else ((obj, ) if isinstance(obj, (Tensor, Module)) else obj)
     if isinstance(obj, (list, tuple)) is False:
         return obj
-    if device is not None:
-        obj = [item.to(device=device) for item in obj]
-    if dtype is not None:
-        obj = [item.to(dtype=dtype) for item in obj]
+    if device is not None or dtype is not None:
+        # cast device and dtype at once, which avoids an intermediate copy
+        obj = [item.to(device=device, dtype=dtype, non_blocking=non_blocking) for item in obj]
     obj = tuple(obj)
     return obj if len(obj) > 1 else obj[0]
 
@@ -424,12 +491,15 @@ def list_take(list_like, index: Union[Sequence[int], int]):
     # take item(s).
     if isinstance(index, int):
         # return nothing if the index is out of bounds.
-        return list_like[index] if index < list_len else NOTHING
+        return list_like[index] if -list_len <= index < list_len else NOTHING
     elif isinstance(index, (list, tuple)):
-        return tuple(list_like[i] if i < list_len else NOTHING for i in index)
+        return tuple(list_like[i] if -list_len <= i < list_len else NOTHING for i in index)
 
 
 def MethodChaining(func):
+    """
+    Make the decorated method return 'self', so that method calls can be chained.
+    """
     @wraps(func)
     def wrapper(self, *args, **kwargs):
         func(self, *args, **kwargs)
@@ -439,6 +509,8 @@ def MethodChaining(func):
 
 class Iter:
 
+    __slots__ = ('_iterable', '_iterator')
+
     def __init__(self, _iterable):
         # iterable item
         self._iterable = _iterable
@@ -451,22 +523,28 @@ class Iter:
         return self
 
     def __next__(self):
-        if isinstance(self._iterator, Iterator):
-            # get next
-            return next(self._iterator)
-        else:
+        # 'iter' always returns an iterator, so only the uninitialized case is checked
+        if self._iterator is None:
             raise StopIteration
+        # get next
+        return next(self._iterator)
 
 
 class IterTool(Iter):
 
+    __slots__ = ('_index', 'items', 'func_set', '_active_funcs', '_length')
+
     def __init__(self, _iterable, progress=False, time=False, index=False, total=False):
         super().__init__(_iterable)
         # iteration index
         self._index = 0
+        # length of the iterable item, computed at the first access
+        self._length = None
         # additional information in iteration
         self.items = [progress, time, index, total]
         self.func_set = [self.progress, self.time, self.index, self.total]
+        # needed functions are selected once rather than at every iteration
+        self._active_funcs = tuple(func for func, item in zip(self.func_set, self.items) if item is True)
 
     def __iter__(self):
         super().__iter__()
@@ -477,20 +555,27 @@ class IterTool(Iter):
     def __next__(self):
         # get the next item
         item = super().__next__()
-        # get needed information indexes
-        indexes = [index for index, value in enumerate(self.items) if value is True]
+        active_funcs = self._active_funcs
+        if len(active_funcs) == 0:
+            self._index += 1
+            return item
         # func set result
-        func_set_res = [func() for func in list_take(self.func_set, indexes)]
+        func_set_res = tuple(func() for func in active_funcs)
         # index increases by 1(this should be done after the current index is accessed)
         self._index += 1
-        return item if len(func_set_res) == 0 else (item, *func_set_res)
+        return (item, *func_set_res)
 
     def __len__(self):
-        try:
-            return len(self._iterable)
-        except Exception:
-            logger.error('The iterable item has no __len__.')
-            return 0
+        length = self._length
+        if length is None:
+            # the length is fixed, so the error is only logged once
+            try:
+                length = len(self._iterable)
+            except Exception:
+                logger.error('The iterable item has no __len__.')
+                length = 0
+            self._length = length
+        return length
 
     def progress(self):
         return self._index, self.__len__()
@@ -505,16 +590,17 @@ class IterTool(Iter):
         return self.__len__()
 
 
+# divisors of the parameter count formats
+PARAMS_FORMAT_DICT = {
+    None: 1,
+    'K': 1000,
+    'M': 1000000
+}
+
+
 def count_params(model: Module, format: str = None, decimal: int = 2):
-    format_dict = {
-        None: 1,
-        'K': 1000,
-        'M': 1000000
-    }
-    divisor = format_dict.get(format, 1)
-
-    num = 0
-    for param in model.parameters():
-        num += param.numel()
+    divisor = PARAMS_FORMAT_DICT.get(format, 1)
+
+    num = sum(param.numel() for param in model.parameters())
     result = num / divisor
     return result if format is None else ('{0:.' + str(decimal) + 'f}{1}').format(result, format)